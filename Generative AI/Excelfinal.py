@@ -1,7 +1,11 @@
 import openpyxl
-from copy import copy
-from openpyxl.styles import Alignment
-from openpyxl.utils import get_column_letter, column_index_from_string
+import xlsxwriter
+import warnings
+from itertools import chain
+from openpyxl.cell.read_only import EMPTY_CELL
+from openpyxl.utils import column_index_from_string
+
+from excelhelpers import OUTPUT_OPTIONS, NUMERIC_KERNELS, BATCH_ROWS, numeric_kernel, cell_format, copy_column_widths, flush_rows
 
 def process_excel(input_file, output_file, col_func_map, col_name_map=None, enable_word_wrap=False, auto_row_height=False):
     """
@@ -10,13 +14,32 @@ def process_excel(input_file, output_file, col_func_map, col_name_map=None, enab
     col_func_map: dict { column (index/name/letter): processing_function }
     col_name_map: dict { column (same key as col_func_map): custom new column name }
     enable_word_wrap: True/False -> whether to enable word wrap in new column
-    auto_row_height: True/False -> whether to auto-adjust row height if wrap is enabled
+    auto_row_height: deprecated and ignored. New columns are sized to their longest
+        value, so every wrapped cell fits on one line at the default row height.
+
+    The source is streamed in read-only mode and the result is written by
+    xlsxwriter in constant_memory mode (active sheet only, formulas saved as
+    their values). Source column widths are carried over; column styles are not.
     """
-    wb = openpyxl.load_workbook(input_file)
-    ws = wb.active  # or wb["SheetName"]
+    if auto_row_height:
+        warnings.warn("auto_row_height is ignored: wrapped cells already fit the default row height",
+                      DeprecationWarning, stacklevel=2)
+
+    src_wb = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    ws = src_wb.active  # or src_wb["SheetName"]
+
+    out_wb = xlsxwriter.Workbook(output_file, OUTPUT_OPTIONS)
+    out_ws = out_wb.add_worksheet(ws.title)
+
+    # One pass over the sheet: read-only mode re-parses the XML per iter_rows call
+    rows = ws.iter_rows()
+    header_cells = next(rows, ())
 
-    # Get headers to resolve names
-    headers = [ws.cell(row=1, column=i).value for i in range(1, ws.max_column + 1)]
+    # Get headers to resolve names (first occurrence wins, like list.index)
+    headers = [cell.value for cell in header_cells]
+    headers_map = {}
+    for idx, header in enumerate(headers, start=1):
+        headers_map.setdefault(header, idx)
 
     # Resolve all columns with their specific function
     resolved_cols = []
@@ -24,77 +47,89 @@ def process_excel(input_file, output_file, col_func_map, col_name_map=None, enab
         if isinstance(col, int):  # already index
             resolved_cols.append((col, func, col))
         elif isinstance(col, str):
-            if col in headers:  # header name
-                resolved_cols.append((headers.index(col) + 1, func, col))
+            if col in headers_map:  # header name
+                resolved_cols.append((headers_map[col], func, col))
             else:  # assume column letter
                 resolved_cols.append((column_index_from_string(col), func, col))
 
-    # Sort descending so insertions don’t shift later columns
-    resolved_cols.sort(key=lambda x: x[0], reverse=True)
+    # Sort ascending so new columns are laid out left to right; entries for the
+    # same source column keep the order the old insert_cols loop produced
+    resolved_cols = sorted(reversed(resolved_cols), key=lambda x: x[0])
+    last_col = max((source_col for source_col, _, _ in resolved_cols), default=0)
 
+    # Determine new column names
+    new_headers = []
     for source_col, process_func, col_key in resolved_cols:
-        target_col = source_col + 1
-        target_letter = get_column_letter(target_col)
-
-        # Insert new column
-        ws.insert_cols(target_col)
-
-        # Determine new column name
         custom_name = None
         if col_name_map and col_key in col_name_map:
             custom_name = col_name_map[col_key]
 
-        original_header = ws.cell(row=1, column=source_col).value or "Column"
-        new_header = custom_name if custom_name else f"{original_header}_Processed"
+        original_header = (headers[source_col - 1] if source_col <= len(headers) else None) or "Column"
+        new_headers.append(custom_name if custom_name else f"{original_header}_Processed")
 
-        # Copy formatting row by row
-        for row in range(1, ws.max_row + 1):
-            source_cell = ws.cell(row=row, column=source_col)
-            target_cell = ws.cell(row=row, column=target_col)
+    # Output layout: each new column lands right after its source column, so
+    # source column c moves right by the number of new columns before it
+    target_cols = [source_col + i + 1 for i, (source_col, _, _) in enumerate(resolved_cols)]
 
-            if row == 1:  # header row
-                target_cell.value = new_header
+    # Copied columns keep their source widths
+    copy_column_widths(out_ws, ws, [source_col for source_col, *_ in resolved_cols])
+
+    format_cache = {}
+
+    # Columns with a registered NumPy kernel are filled in a batch of rows at a time
+    funcs = [process_func for _, process_func, _ in resolved_cols]
+    kernels = [NUMERIC_KERNELS.get(process_func) for process_func in funcs]
+    deferred = [[] for _ in resolved_cols]  # (source value, output row, position) per column
 
-            if source_cell.has_style:
-                target_cell.font = copy(source_cell.font)
-                target_cell.border = copy(source_cell.border)
-                target_cell.fill = copy(source_cell.fill)
-                target_cell.number_format = copy(source_cell.number_format)
-                target_cell.protection = copy(source_cell.protection)
-                target_cell.alignment = copy(source_cell.alignment)
+    # Rows are written straight away unless a kernel column needs a batch first.
+    # No row heights are tracked: each new column is as wide as its longest value
+    # plus padding, so no wrapped cell ever needs more than the default height.
+    batch_rows = BATCH_ROWS if any(kernel is not None for kernel in kernels) else 1
+    out_rows = []
+
+    # Process values row by row, splicing new columns into the copied row
+    max_lens = [len(new_header) for new_header in new_headers]
+    for row, src_cells in enumerate(chain([header_cells], rows), start=1):
+        if len(src_cells) < last_col:  # pad short rows
+            src_cells += (EMPTY_CELL,) * (last_col - len(src_cells))
+
+        copied = [(cell.value, cell_format(out_wb, cell, format_cache) if getattr(cell, "has_style", False) else None)
+                  for cell in src_cells]
+
+        out_row = []
+        start = 0
+        for i, (source_col, process_func, _) in enumerate(resolved_cols):
+            out_row += copied[start:source_col]
+            start = source_col
+
+            source_cell = src_cells[source_col - 1]
+            if row == 1:  # header row
+                processed = new_headers[i]
+            elif kernels[i] is not None:
+                processed = None  # set when the batch is flushed
+                deferred[i].append((source_cell.value, out_row, len(out_row)))
+            else:
+                processed = process_func(source_cell.value)
+                if processed is not None:
+                    max_lens[i] = max(max_lens[i], len(str(processed)))
 
             # Enable word wrap if requested
-            if enable_word_wrap:
-                target_cell.alignment = Alignment(
-                    horizontal=target_cell.alignment.horizontal if target_cell.alignment else "general",
-                    vertical=target_cell.alignment.vertical if target_cell.alignment else "bottom",
-                    wrapText=True
-                )
-
-        # Process values
-        max_len = len(new_header)
-        for row in range(2, ws.max_row + 1):
-            cell_value = ws.cell(row=row, column=source_col).value
-            processed = process_func(cell_value)
-            ws.cell(row=row, column=target_col).value = processed
-            if processed is not None:
-                max_len = max(max_len, len(str(processed)))
-
-        # Expand column width
-        ws.column_dimensions[target_letter].width = max_len + 2
-
-        # Auto-adjust row height if chosen
-        if enable_word_wrap and auto_row_height:
-            col_width = ws.column_dimensions[target_letter].width or 10
-            for row in range(2, ws.max_row + 1):
-                val = ws.cell(row=row, column=target_col).value
-                if val:
-                    text_len = len(str(val))
-                    est_lines = max(1, int(text_len / col_width) + 1)
-                    ws.row_dimensions[row].height = est_lines * 15  # ~15 points per line
+            out_row.append((processed, cell_format(out_wb, source_cell, format_cache, wrap=enable_word_wrap)))
+
+        out_row += copied[start:]
+        out_rows.append((row, out_row))
+        if len(out_rows) >= batch_rows:
+            flush_rows(out_ws, out_rows, kernels, funcs, deferred, max_lens)
+
+    flush_rows(out_ws, out_rows, kernels, funcs, deferred, max_lens)
+    src_wb.close()
+
+    # Expand column width (xlsxwriter accepts this after the rows)
+    for target_col, max_len in zip(target_cols, max_lens):
+        out_ws.set_column(target_col - 1, target_col - 1, max_len + 2)
 
     # Save workbook
-    wb.save(output_file)
+    out_wb.close()
     print(f"✅ Processing complete. Output saved as {output_file}")
 
 
@@ -106,16 +141,12 @@ if __name__ == "__main__":
     
     wrap_choice = input("🔄 Enable word wrap in new column? (y/n): ").strip().lower()
     enable_word_wrap = wrap_choice == "y"
-    
-    auto_row_height = False
-    if enable_word_wrap:
-        row_choice = input("📏 Auto-adjust row height for wrapped text? (y/n): ").strip().lower()
-        auto_row_height = row_choice == "y"
 
     # Example processing functions
     def uppercase(val):
         return val.upper() if isinstance(val, str) else val
 
+    @numeric_kernel(lambda arr: arr * 2)
     def double(val):
         return val * 2 if isinstance(val, (int, float)) else val
 
@@ -136,4 +167,4 @@ if __name__ == "__main__":
         if name:
             col_name_map[col] = name
 
-    process_excel(input_file, output_file, col_func_map, col_name_map, enable_word_wrap, auto_row_height)
+    process_excel(input_file, output_file, col_func_map, col_name_map, enable_word_wrap)
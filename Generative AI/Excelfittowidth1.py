@@ -15,8 +15,11 @@ def process_excel(input_file, output_file, col_func_map, col_name_map=None, enab
     wb = openpyxl.load_workbook(input_file)
     ws = wb.active  # or wb["SheetName"]
 
+    # max_row/max_column rescan the sheet on every access, so read them once
+    max_row = ws.max_row
+
     # Get headers to resolve names
-    headers = [ws.cell(row=1, column=i).value for i in range(1, ws.max_column + 1)]
+    headers = [cell.value for cell in ws[1]]
 
     # Resolve all columns with their specific function
     resolved_cols = []
@@ -47,13 +50,16 @@ def process_excel(input_file, output_file, col_func_map, col_name_map=None, enab
         original_header = ws.cell(row=1, column=source_col).value or "Column"
         new_header = custom_name if custom_name else f"{original_header}_Processed"
 
-        # Copy formatting row by row
-        for row in range(1, ws.max_row + 1):
-            source_cell = ws.cell(row=row, column=source_col)
-            target_cell = ws.cell(row=row, column=target_col)
+        # Auto-adjust row height if chosen
+        adjust_height = enable_word_wrap and auto_row_height
+        col_width = int(ws.column_dimensions[target_letter].width or 10)
+        h_per_line = 15  # ~15 points per line
 
-            if row == 1:  # header row
-                target_cell.value = new_header
+        # Copy formatting and process values in one sweep over both columns
+        for src_row, tgt_row in zip(ws.iter_rows(min_col=source_col, max_col=source_col, max_row=max_row),
+                                    ws.iter_rows(min_col=target_col, max_col=target_col, max_row=max_row)):
+            source_cell = src_row[0]
+            target_cell = tgt_row[0]
 
             if source_cell.has_style:
                 target_cell.font = copy(source_cell.font)
@@ -71,27 +77,25 @@ def process_excel(input_file, output_file, col_func_map, col_name_map=None, enab
                     wrapText=True
                 )
 
-        # Process values
-        for row in range(2, ws.max_row + 1):
-            cell_value = ws.cell(row=row, column=source_col).value
-            processed = process_func(cell_value)
-            ws.cell(row=row, column=target_col).value = processed
+            if source_cell.row == 1:  # header row
+                target_cell.value = new_header
+                continue
 
-        # Auto-adjust row height if chosen
-        if enable_word_wrap and auto_row_height:
-            col_width = ws.column_dimensions[target_letter].width or 10
-            for row in range(2, ws.max_row + 1):
-                val = ws.cell(row=row, column=target_col).value
-                if val:
-                    text_len = len(str(val))
-                    est_lines = max(1, int(text_len / col_width) + 1)
-                    ws.row_dimensions[row].height = est_lines * 15  # ~15 points per line
+            processed = process_func(source_cell.value)
+            target_cell.value = processed
+
+            if adjust_height and processed:
+                text_len = len(str(processed))
+                if text_len > col_width:  # one line fits the default height
+                    est_lines = (text_len + col_width - 1) // col_width
+                    ws.row_dimensions[source_cell.row].height = est_lines * h_per_line
 
     # -------- Fit ALL columns to width --------
-    for col in range(1, ws.max_column + 1):
+    max_col = ws.max_column  # includes the inserted columns
+    for col in range(1, max_col + 1):
         col_letter = get_column_letter(col)
         max_len = 0
-        for row in range(1, ws.max_row + 1):
+        for row in range(1, max_row + 1):
             val = ws.cell(row=row, column=col).value
             if val:
                 max_len = max(max_len, len(str(val)))
@@ -11,8 +11,11 @@ def process_excel(input_file, output_file, col_func_map):
     wb = openpyxl.load_workbook(input_file)
     ws = wb.active  # or wb["SheetName"]
 
+    # max_row/max_column rescan the sheet on every access, so read them once
+    max_row = ws.max_row
+
     # Get headers to resolve names
-    headers = [ws.cell(row=1, column=i).value for i in range(1, ws.max_column + 1)]
+    headers = [cell.value for cell in ws[1]]
 
     # Resolve all columns with their specific function
     resolved_cols = []
@@ -35,13 +38,14 @@ def process_excel(input_file, output_file, col_func_map):
         # Insert new column
         ws.insert_cols(target_col)
 
-        # Copy formatting row by row
-        for row in range(1, ws.max_row + 1):
-            source_cell = ws.cell(row=row, column=source_col)
-            target_cell = ws.cell(row=row, column=target_col)
+        new_header = f"{ws.cell(row=1, column=source_col).value}_Processed"
+        max_len = len(new_header)
 
-            if row == 1:  # header
-                target_cell.value = f"{ws.cell(row=1, column=source_col).value}_Processed"
+        # Copy formatting and process values in one sweep over both columns
+        for src_row, tgt_row in zip(ws.iter_rows(min_col=source_col, max_col=source_col, max_row=max_row),
+                                    ws.iter_rows(min_col=target_col, max_col=target_col, max_row=max_row)):
+            source_cell = src_row[0]
+            target_cell = tgt_row[0]
 
             if source_cell.has_style:
                 target_cell.font = copy(source_cell.font)
@@ -51,12 +55,12 @@ def process_excel(input_file, output_file, col_func_map):
                 target_cell.protection = copy(source_cell.protection)
                 target_cell.alignment = copy(source_cell.alignment)
 
-        # Process values
-        max_len = len(ws.cell(row=1, column=target_col).value or "")
-        for row in range(2, ws.max_row + 1):
-            cell_value = ws.cell(row=row, column=source_col).value
-            processed = process_func(cell_value)
-            ws.cell(row=row, column=target_col).value = processed
+            if source_cell.row == 1:  # header
+                target_cell.value = new_header
+                continue
+
+            processed = process_func(source_cell.value)
+            target_cell.value = processed
             if processed is not None:
                 max_len = max(max_len, len(str(processed)))
 
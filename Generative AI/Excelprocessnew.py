@@ -1,18 +1,36 @@
 import openpyxl
-from copy import copy
-from openpyxl.utils import get_column_letter, column_index_from_string
+import xlsxwriter
+from itertools import chain
+from openpyxl.cell.read_only import EMPTY_CELL
+from openpyxl.utils import column_index_from_string
+
+from excelhelpers import OUTPUT_OPTIONS, NUMERIC_KERNELS, BATCH_ROWS, numeric_kernel, cell_format, copy_column_widths, flush_rows
 
 def process_excel(input_file, output_file, col_func_map):
     """
     input_file: source Excel file
     output_file: output Excel file
     col_func_map: dict { column (index/name/letter): processing_function }
+
+    The source is streamed in read-only mode and the result is written by
+    xlsxwriter in constant_memory mode (active sheet only, formulas saved as
+    their values). Source column widths are carried over; column styles are not.
     """
-    wb = openpyxl.load_workbook(input_file)
-    ws = wb.active  # or wb["SheetName"]
+    src_wb = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    ws = src_wb.active  # or src_wb["SheetName"]
+
+    out_wb = xlsxwriter.Workbook(output_file, OUTPUT_OPTIONS)
+    out_ws = out_wb.add_worksheet(ws.title)
+
+    # One pass over the sheet: read-only mode re-parses the XML per iter_rows call
+    rows = ws.iter_rows()
+    header_cells = next(rows, ())
 
-    # Get headers to resolve names
-    headers = [ws.cell(row=1, column=i).value for i in range(1, ws.max_column + 1)]
+    # Get headers to resolve names (first occurrence wins, like list.index)
+    headers = [cell.value for cell in header_cells]
+    headers_map = {}
+    for idx, header in enumerate(headers, start=1):
+        headers_map.setdefault(header, idx)
 
     # Resolve all columns with their specific function
     resolved_cols = []
@@ -20,51 +38,79 @@ def process_excel(input_file, output_file, col_func_map):
         if isinstance(col, int):  # already index
             resolved_cols.append((col, func))
         elif isinstance(col, str):
-            if col in headers:  # header name
-                resolved_cols.append((headers.index(col) + 1, func))
+            if col in headers_map:  # header name
+                resolved_cols.append((headers_map[col], func))
             else:  # assume column letter
                 resolved_cols.append((column_index_from_string(col), func))
 
-    # Sort descending so insertions don’t shift later columns
-    resolved_cols.sort(key=lambda x: x[0], reverse=True)
+    # Sort ascending so new columns are laid out left to right; entries for the
+    # same source column keep the order the old insert_cols loop produced
+    resolved_cols = sorted(reversed(resolved_cols), key=lambda x: x[0])
+    last_col = max((source_col for source_col, _ in resolved_cols), default=0)
+
+    # New column headers
+    new_headers = [f"{headers[source_col - 1] if source_col <= len(headers) else None}_Processed"
+                   for source_col, _ in resolved_cols]
+
+    # Output layout: each new column lands right after its source column, so
+    # source column c moves right by the number of new columns before it
+    target_cols = [source_col + i + 1 for i, (source_col, _) in enumerate(resolved_cols)]
+
+    # Copied columns keep their source widths
+    copy_column_widths(out_ws, ws, [source_col for source_col, *_ in resolved_cols])
 
-    for source_col, process_func in resolved_cols:
-        target_col = source_col + 1
-        target_letter = get_column_letter(target_col)
+    format_cache = {}
 
-        # Insert new column
-        ws.insert_cols(target_col)
+    # Columns with a registered NumPy kernel are filled in a batch of rows at a time
+    funcs = [process_func for _, process_func in resolved_cols]
+    kernels = [NUMERIC_KERNELS.get(process_func) for process_func in funcs]
+    deferred = [[] for _ in resolved_cols]  # (source value, output row, position) per column
 
-        # Copy formatting row by row
-        for row in range(1, ws.max_row + 1):
-            source_cell = ws.cell(row=row, column=source_col)
-            target_cell = ws.cell(row=row, column=target_col)
+    # Rows are written straight away unless a kernel column needs a batch first
+    batch_rows = BATCH_ROWS if any(kernel is not None for kernel in kernels) else 1
+    out_rows = []
 
+    # Process values row by row, splicing new columns into the copied row
+    max_lens = [len(new_header) for new_header in new_headers]
+    for row, src_cells in enumerate(chain([header_cells], rows), start=1):
+        if len(src_cells) < last_col:  # pad short rows
+            src_cells += (EMPTY_CELL,) * (last_col - len(src_cells))
+
+        copied = [(cell.value, cell_format(out_wb, cell, format_cache)) for cell in src_cells]
+
+        out_row = []
+        start = 0
+        for i, (source_col, process_func) in enumerate(resolved_cols):
+            out_row += copied[start:source_col]
+            start = source_col
+
+            source_cell = src_cells[source_col - 1]
             if row == 1:  # header
-                target_cell.value = f"{ws.cell(row=1, column=source_col).value}_Processed"
-
-            if source_cell.has_style:
-                target_cell.font = copy(source_cell.font)
-                target_cell.border = copy(source_cell.border)
-                target_cell.fill = copy(source_cell.fill)
-                target_cell.number_format = copy(source_cell.number_format)
-                target_cell.protection = copy(source_cell.protection)
-                target_cell.alignment = copy(source_cell.alignment)
-
-        # Process values
-        max_len = len(ws.cell(row=1, column=target_col).value or "")
-        for row in range(2, ws.max_row + 1):
-            cell_value = ws.cell(row=row, column=source_col).value
-            processed = process_func(cell_value)
-            ws.cell(row=row, column=target_col).value = processed
-            if processed is not None:
-                max_len = max(max_len, len(str(processed)))
-
-        # Auto-fit width
-        ws.column_dimensions[target_letter].width = max_len + 2
+                processed = new_headers[i]
+            elif kernels[i] is not None:
+                processed = None  # set when the batch is flushed
+                deferred[i].append((source_cell.value, out_row, len(out_row)))
+            else:
+                processed = process_func(source_cell.value)
+                if processed is not None:
+                    max_lens[i] = max(max_lens[i], len(str(processed)))
+
+            out_row.append((processed, cell_format(out_wb, source_cell, format_cache)))
+
+        out_row += copied[start:]
+        out_rows.append((row, out_row))
+        if len(out_rows) >= batch_rows:
+            flush_rows(out_ws, out_rows, kernels, funcs, deferred, max_lens)
+
+    flush_rows(out_ws, out_rows, kernels, funcs, deferred, max_lens)
+    src_wb.close()
+
+    # Auto-fit width (xlsxwriter accepts this after the rows)
+    for target_col, max_len in zip(target_cols, max_lens):
+        out_ws.set_column(target_col - 1, target_col - 1, max_len + 2)
 
     # Save workbook
-    wb.save(output_file)
+    out_wb.close()
     print(f"✅ Processing complete. Output saved as {output_file}")
 
 
@@ -78,6 +124,7 @@ if __name__ == "__main__":
     def uppercase(val):
         return val.upper() if isinstance(val, str) else val
 
+    @numeric_kernel(lambda arr: arr * 2)
     def double(val):
         return val * 2 if isinstance(val, (int, float)) else val
 
@@ -1,33 +1,52 @@
 import streamlit as st
 import sqlite3
 import datetime
+from chatstore import encode_messages, decode_messages
 
 # ---------- Database Setup ----------
-conn = sqlite3.connect("chatbot.db")
-c = conn.cursor()
-c.execute("""
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT UNIQUE,
     password TEXT
-)
-""")
-c.execute("""
+);
+
 CREATE TABLE IF NOT EXISTS chats (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
     title TEXT,
-    messages TEXT,
+    messages BLOB,  -- zstd-compressed JSON
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-""")
-conn.commit()
+);
+
+-- Lets the per-user chat list skip the table scan and the sort
+CREATE INDEX IF NOT EXISTS idx_chats_user_created ON chats(user_id, created_at DESC);
+"""
+
+# Reused verbatim so sqlite3's statement cache keeps it compiled
+SAVE_SQL = "INSERT INTO chats (user_id, title, messages) VALUES (?, ?, ?)"
+
+# One connection per process, shared by all sessions and reruns; the schema is
+# set up once here instead of on every rerun. Autocommit mode; WAL keeps
+# sidebar reads from blocking on chat saves.
+@st.cache_resource(show_spinner=False)
+def get_connection():
+    conn = sqlite3.connect("chatbot.db", check_same_thread=False, isolation_level=None)
+    conn.executescript(SCHEMA)
+    return conn
+
+conn = get_connection()
+c = conn.cursor()
 
 # ---------- Helper Functions ----------
 def register_user(username, password):
     try:
         c.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
-        conn.commit()
         return True
     except sqlite3.IntegrityError:
         return False
@@ -37,18 +56,23 @@ def login_user(username, password):
     return c.fetchone()
 
 def save_chat(user_id, title, messages):
-    c.execute("INSERT INTO chats (user_id, title, messages) VALUES (?, ?, ?)",
-              (user_id, title, messages))
-    conn.commit()
-
+    blob = encode_messages(messages)
+    # A single INSERT is atomic in autocommit mode; no explicit transaction on
+    # the connection every session shares
+    c.execute(SAVE_SQL, (user_id, title, blob))
+    get_user_chats.clear()  # the sidebar list must show the new chat
+
+# Cached across reruns: the sidebar asks for these on every render
+@st.cache_data(ttl=30, show_spinner=False)
 def get_user_chats(user_id):
     c.execute("SELECT id, title FROM chats WHERE user_id = ? ORDER BY created_at DESC", (user_id,))
     return c.fetchall()
 
+@st.cache_data(max_entries=256, show_spinner=False)  # saved chats never change
 def get_chat_messages(chat_id):
     c.execute("SELECT messages FROM chats WHERE id = ?", (chat_id,))
     result = c.fetchone()
-    return result[0] if result else ""
+    return decode_messages(result[0]) if result else []
 
 # ---------- Streamlit App ----------
 st.set_page_config(page_title="ChatGPT Style Chatbot", layout="wide")
@@ -104,7 +128,7 @@ with st.sidebar:
             chat_dict = {title: cid for cid, title in chats}
             selected = st.selectbox("Select a chat", [""] + list(chat_dict.keys()))
             if selected:
-                st.session_state.messages = eval(get_chat_messages(chat_dict[selected]))
+                st.session_state.messages = get_chat_messages(chat_dict[selected])
                 st.session_state.chat_title = selected
                 st.success(f"Loaded chat: {selected}")
 
@@ -131,7 +155,7 @@ if st.session_state.logged_in:
 
     if st.button("Save Chat"):
         if st.session_state.chat_title and st.session_state.messages:
-            save_chat(st.session_state.user_id, st.session_state.chat_title, str(st.session_state.messages))
+            save_chat(st.session_state.user_id, st.session_state.chat_title, st.session_state.messages)
             st.success("Chat saved!")
 else:
     st.info("Please log in to start chatting.")
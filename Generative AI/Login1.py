@@ -1,6 +1,7 @@
 import streamlit as st
 import sqlite3
 import datetime
+from chatstore import encode_messages, decode_messages
 
 # ---------- Database Setup ----------
 conn = sqlite3.connect("chatbot.db", check_same_thread=False)
@@ -18,7 +19,7 @@ CREATE TABLE IF NOT EXISTS chats (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER,
     title TEXT,
-    messages TEXT,
+    messages BLOB,  -- zstd-compressed JSON
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 )
 """)
@@ -39,7 +40,7 @@ def login_user(username, password):
 
 def save_chat(user_id, title, messages):
     c.execute("INSERT INTO chats (user_id, title, messages) VALUES (?, ?, ?)",
-              (user_id, title, messages))
+              (user_id, title, encode_messages(messages)))
     conn.commit()
 
 def get_user_chats(user_id):
@@ -49,7 +50,7 @@ def get_user_chats(user_id):
 def get_chat_messages(chat_id):
     c.execute("SELECT messages FROM chats WHERE id = ?", (chat_id,))
     result = c.fetchone()
-    return result[0] if result else ""
+    return decode_messages(result[0]) if result else []
 
 # ---------- Session State ----------
 if "logged_in" not in st.session_state:
@@ -103,7 +104,7 @@ with st.sidebar:
         chats = get_user_chats(st.session_state.user_id)
         for cid, title in chats:
             if st.button(f"📄 {title}", key=f"chat_{cid}", use_container_width=True):
-                st.session_state.messages = eval(get_chat_messages(cid))
+                st.session_state.messages = get_chat_messages(cid)
                 st.session_state.chat_title = title
                 st.experimental_rerun()
 
@@ -131,7 +132,7 @@ if st.session_state.logged_in:
 
     if st.button("💾 Save Chat"):
         if st.session_state.chat_title and st.session_state.messages:
-            save_chat(st.session_state.user_id, st.session_state.chat_title, str(st.session_state.messages))
+            save_chat(st.session_state.user_id, st.session_state.chat_title, st.session_state.messages)
             st.success("Chat saved!")
 
 else:
@@ -0,0 +1,28 @@
+"""Encoding of saved chat messages, shared by the Login*.py chatbot apps."""
+
+import ast
+import json
+
+import zstandard
+
+
+def encode_messages(messages):
+    """Serialize a message list to a zstd-compressed JSON blob."""
+    # Compressors are not thread-safe, so each save gets its own
+    return zstandard.ZstdCompressor(level=3).compress(json.dumps(messages).encode())
+
+
+def decode_messages(data):
+    """Turn a stored messages value back into a list, whatever format it was saved in."""
+    if not data:
+        return []
+    if isinstance(data, bytes):
+        try:
+            data = zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError:  # stored uncompressed
+            pass
+        data = data.decode()
+    try:
+        return json.loads(data)
+    except ValueError:  # chats saved before JSON storage hold a Python repr
+        return ast.literal_eval(data)
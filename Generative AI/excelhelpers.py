@@ -0,0 +1,230 @@
+"""
+Helpers shared by the streaming Excel scripts (Excelfinal.py, Excelprocessnew.py):
+NumPy kernels for numeric columns and openpyxl -> xlsxwriter style translation.
+"""
+
+from bisect import bisect_left
+from xml.etree.ElementTree import iterparse
+
+from openpyxl.xml.constants import SHEET_MAIN_NS
+
+try:
+    import numpy as np
+except ImportError:  # vectorized kernels are optional
+    np = None
+
+# { processing_function: NumPy version applied to a whole numeric column }
+NUMERIC_KERNELS = {}
+
+def numeric_kernel(kernel):
+    """
+    Register kernel as the vectorized form of the decorated processing function.
+    It is applied to the int/float cells of a column (the rest still go through
+    the function), e.g.
+        @numeric_kernel(lambda arr: arr * 2)
+    """
+    def register(func):
+        NUMERIC_KERNELS[func] = kernel
+        return func
+    return register
+
+def apply_numeric_kernel(kernel, func, values):
+    """
+    Process values with kernel in one NumPy pass for the numbers and func for
+    everything else (blanks, text, dates)
+    """
+    numeric = [i for i, v in enumerate(values) if type(v) in (int, float)]
+    if np is None or not numeric:
+        return [func(v) for v in values]
+    results = [func(v) if type(v) not in (int, float) else None for v in values]
+    numbers = [values[i] for i in numeric]
+    # float64, which is how Excel stores every number anyway: an int64 array
+    # would silently wrap around on overflow
+    for i, value, result in zip(numeric, numbers, kernel(np.asarray(numbers, dtype=np.float64)).tolist()):
+        # Whole results for int cells go back to ints, like `val * 2` on an int cell
+        if type(value) is int and isinstance(result, float) and result.is_integer():
+            result = int(result)
+        results[i] = result
+    return results
+
+# xlsxwriter.Workbook options for the processed output. Values come from a
+# data_only read, so text such as "== totals ==" must stay text, not become a formula
+OUTPUT_OPTIONS = {
+    "constant_memory": True,  # flush each row to disk once the next one starts
+    "strings_to_formulas": False,
+    "strings_to_urls": False,
+    "default_date_format": "yyyy-mm-dd",
+}
+
+# openpyxl style names -> xlsxwriter format values
+BORDER_STYLES = {"thin": 1, "medium": 2, "dashed": 3, "dotted": 4, "thick": 5, "double": 6, "hair": 7,
+                 "mediumDashed": 8, "dashDot": 9, "mediumDashDot": 10, "dashDotDot": 11,
+                 "mediumDashDotDot": 12, "slantDashDot": 13}
+H_ALIGN = {"left": "left", "center": "center", "right": "right", "fill": "fill", "justify": "justify",
+           "centerContinuous": "center_across", "distributed": "distributed"}
+V_ALIGN = {"top": "top", "center": "vcenter", "bottom": "bottom", "justify": "vjustify",
+           "distributed": "vdistributed"}
+UNDERLINES = {"single": 1, "double": 2, "singleAccounting": 33, "doubleAccounting": 34}
+
+def rgb(color):
+    """
+    "#RRGGBB" for an explicit openpyxl colour, None for theme/indexed colours
+    """
+    if color is not None and color.type == "rgb" and isinstance(color.rgb, str):
+        return "#" + color.rgb[-6:]
+    return None
+
+def format_props(source_cell):
+    """
+    Translate an openpyxl cell style into xlsxwriter format properties
+    (fonts, solid fills, borders, number format, alignment, protection)
+    """
+    props = {}
+
+    font = source_cell.font
+    if font is not None:
+        if font.name:
+            props["font_name"] = font.name
+        if font.sz:
+            props["font_size"] = font.sz
+        if font.b:
+            props["bold"] = True
+        if font.i:
+            props["italic"] = True
+        if font.strike:
+            props["font_strikeout"] = True
+        if font.u:
+            props["underline"] = UNDERLINES.get(font.u, 1)
+        if font.vertAlign in ("superscript", "subscript"):
+            props["font_script"] = 1 if font.vertAlign == "superscript" else 2
+        if rgb(font.color):
+            props["font_color"] = rgb(font.color)
+
+    fill = source_cell.fill
+    if getattr(fill, "fill_type", None) == "solid" and rgb(fill.fgColor):
+        props["pattern"] = 1
+        props["bg_color"] = rgb(fill.fgColor)
+
+    border = source_cell.border
+    if border is not None:
+        for side_name in ("left", "right", "top", "bottom"):
+            side = getattr(border, side_name)
+            if side is not None and side.style:
+                props[side_name] = BORDER_STYLES.get(side.style, 1)
+                if rgb(side.color):
+                    props[f"{side_name}_color"] = rgb(side.color)
+
+    if source_cell.number_format and source_cell.number_format != "General":
+        props["num_format"] = source_cell.number_format
+
+    alignment = source_cell.alignment
+    if alignment is not None:
+        if alignment.horizontal in H_ALIGN:
+            props["align"] = H_ALIGN[alignment.horizontal]
+        if alignment.vertical in V_ALIGN:
+            props["valign"] = V_ALIGN[alignment.vertical]
+        if alignment.wrap_text:
+            props["text_wrap"] = True
+        if alignment.shrink_to_fit:
+            props["shrink"] = True
+        if alignment.indent:
+            props["indent"] = int(alignment.indent)
+        rotation = alignment.text_rotation or 0
+        if rotation:
+            props["rotation"] = 270 if rotation == 255 else rotation if rotation <= 90 else 90 - rotation
+
+    protection = source_cell.protection
+    if protection is not None:
+        if not protection.locked:
+            props["locked"] = False
+        if protection.hidden:
+            props["hidden"] = True
+
+    return props
+
+def cell_format(out_wb, source_cell, format_cache, wrap=False):
+    """
+    xlsxwriter Format matching source_cell's style (plus text wrap if asked), None if plain
+    format_cache: dict { (source style_array, wrap): Format }
+    """
+    styled = getattr(source_cell, "has_style", False)  # EMPTY_CELL has no styles
+    if not styled and not wrap:
+        return None
+
+    # One Format per distinct source style, shared by every cell using it
+    key = (source_cell.style_array if styled else None, wrap)
+    fmt = format_cache.get(key)
+    if fmt is None:
+        props = format_props(source_cell) if styled else {}
+        if wrap:
+            props["text_wrap"] = True
+        fmt = format_cache[key] = out_wb.add_format(props)
+    return fmt
+
+def write_cells(out_ws, row, out_row):
+    """
+    Write one output row of (value, format) pairs; row is 1-based
+    """
+    for col, (value, fmt) in enumerate(out_row):
+        if value is not None or fmt is not None:
+            out_ws.write(row - 1, col, value, fmt)
+
+# Rows held back at a time while their kernel columns are filled in; memory
+# stays bounded on large sheets and each kernel call still sees many values
+BATCH_ROWS = 10_000
+
+def flush_rows(out_ws, out_rows, kernels, funcs, deferred, max_lens):
+    """
+    Fill the kernel columns of the buffered rows, write them and empty the buffers
+    out_rows: list of (1-based row, [(value, format), ...])
+    kernels / funcs / deferred / max_lens: per new column; deferred holds
+        (source value, output row, position) for each cell left to fill
+    """
+    for i, kernel in enumerate(kernels):
+        if kernel is None or not deferred[i]:
+            continue
+        values = [value for value, _, _ in deferred[i]]
+        for (_, out_row, pos), processed in zip(deferred[i], apply_numeric_kernel(kernel, funcs[i], values)):
+            out_row[pos] = (processed, out_row[pos][1])
+            if processed is not None:
+                max_lens[i] = max(max_lens[i], len(str(processed)))
+        deferred[i].clear()
+
+    for row, out_row in out_rows:
+        write_cells(out_ws, row, out_row)
+    out_rows.clear()
+
+COL_TAG = f"{{{SHEET_MAIN_NS}}}col"
+SHEET_DATA_TAG = f"{{{SHEET_MAIN_NS}}}sheetData"
+
+def source_column_widths(ws):
+    """
+    (min, max, width, hidden) for every <col> with a width in a read-only worksheet
+    (read-only mode has no column_dimensions; <cols> precedes the cells, so only
+    the start of the sheet XML is parsed)
+    """
+    widths = []
+    with ws._get_source() as source:
+        for _, element in iterparse(source, events=("start",)):
+            if element.tag == COL_TAG and element.get("width"):
+                widths.append((int(element.get("min")), int(element.get("max")),
+                               float(element.get("width")), element.get("hidden") in ("1", "true")))
+            elif element.tag == SHEET_DATA_TAG:
+                break
+    return widths
+
+def copy_column_widths(out_ws, ws, source_cols):
+    """
+    Give the copied columns of out_ws the widths set in the source sheet ws
+    source_cols: sorted source column (1-based) of each inserted column; the
+        copied columns after it move one to the right
+    """
+    for first, last, width, hidden in source_column_widths(ws):
+        while first <= last:
+            # Columns up to the next insertion point keep the same offset
+            end = min([col for col in source_cols if first <= col < last] + [last])
+            shift = bisect_left(source_cols, first)
+            # Pixels, as the XML width already includes xlsxwriter's cell padding
+            out_ws.set_column_pixels(first - 1 + shift, min(end - 1 + shift, 16383), round(width * 7),
+                                     None, {"hidden": True} if hidden else None)
+            first = end + 1
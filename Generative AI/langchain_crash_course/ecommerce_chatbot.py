@@ -4,7 +4,8 @@
 """
 LangGraph + LangChain based chatbot back‑end for an e‑commerce help‑desk.
 
-* Routes: FAQ (sub‑routes: Payments, Orders) and General Query
+* Routes: FAQ (sub‑routes: Payments, Orders) and General Query, answered by one
+  node that picks its prompt from the route
 * Uses OpenAI chat model via LangChain (replace OPENAI_API_KEY env‑var)
 * Exposes `run_chatbot()` so the Streamlit UI can invoke the graph easily.
 """
@@ -12,70 +13,101 @@ LangGraph + LangChain based chatbot back‑end for an e‑commerce help‑desk.
 from __future__ import annotations
 
 import os
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
 
+import httpx
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
+# Chat history entries are plain {"role": "user" | "assistant", "content": str} dicts
+ChatMessage = Dict[str, str]
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Model setup
 # ──────────────────────────────────────────────────────────────────────────────
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "sk‑YOUR_KEY_HERE")  # <‑‑ replace in .env or OS env
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2, api_key=OPENAI_API_KEY)
+
+# Pooled HTTP/2 client shared by every Streamlit session (needs httpx[http2])
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_CLIENT = httpx.Client(http2=True, limits=_HTTP_LIMITS, timeout=60.0)
+
+llm = ChatOpenAI(
+    model="gpt-4o-mini",
+    temperature=0.2,
+    api_key=OPENAI_API_KEY,
+    http_client=_HTTP_CLIENT,
+)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Prompt chains (built once at import, reused on every turn)
+# ──────────────────────────────────────────────────────────────────────────────
+faq_llm = llm.with_config({"tags": ["faq"]})
+
+PAYMENTS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an e‑commerce customer‑service FAQ assistant. "
+     "Answer QUESTIONS ABOUT PAYMENTS only (billing, refunds, failed payments, accepted methods, etc.). "
+     "Be concise and friendly."),
+    ("human", "{q}"),
+])
+ORDERS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are an e‑commerce customer‑service FAQ assistant. "
+     "Answer QUESTIONS ABOUT ORDERS only (status, tracking, cancellation, modifications, etc.). "
+     "Be concise and friendly."),
+    ("human", "{q}"),
+])
+GENERAL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system",
+     "You are a helpful, empathetic e‑commerce customer‑support assistant. "
+     "Answer the user's question in a clear, friendly manner."),
+    ("human", "{q}"),
+])
+
+PAYMENTS_CHAIN = PAYMENTS_PROMPT | faq_llm
+ORDERS_CHAIN = ORDERS_PROMPT | faq_llm
+GENERAL_CHAIN = GENERAL_PROMPT | llm
+
+# Config shared by every graph run
+RUN_CONFIG: RunnableConfig = {"run_name": "ecommerce_chatbot"}
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Node functions
 # ──────────────────────────────────────────────────────────────────────────────
 
-def faq_payments_node(state: Dict) -> Dict:
-    """Handle FAQ → Payments questions."""
+def _answer(state: Dict, chain) -> Dict:
+    """Answer the user's question with chain and append the turn to the history."""
     q = state["user_input"]
-    history: List[BaseMessage] = state.get("chat_history", [])
-    sys_prompt = (
-        "You are an e‑commerce customer‑service FAQ assistant. "
-        "Answer QUESTIONS ABOUT PAYMENTS only (billing, refunds, failed payments, accepted methods, etc.). "
-        "Be concise and friendly."
-    )
-    messages = [HumanMessage(content=f"{sys_prompt}\n\nQ: {q}")]
-    ans = llm.invoke(messages).content
+    history: List[ChatMessage] = state.get("chat_history", [])
+    ans = chain.invoke({"q": q}).content
 
-    history += [HumanMessage(content=q), AIMessage(content=ans)]
+    history += [{"role": "user", "content": q}, {"role": "assistant", "content": ans}]
     state.update({"chat_history": history, "response": ans})
     return state
 
 
-def faq_orders_node(state: Dict) -> Dict:
-    """Handle FAQ → Orders questions."""
-    q = state["user_input"]
-    history: List[BaseMessage] = state.get("chat_history", [])
-    sys_prompt = (
-        "You are an e‑commerce customer‑service FAQ assistant. "
-        "Answer QUESTIONS ABOUT ORDERS only (status, tracking, cancellation, modifications, etc.). "
-        "Be concise and friendly."
-    )
-    messages = [HumanMessage(content=f"{sys_prompt}\n\nQ: {q}")]
-    ans = llm.invoke(messages).content
+# (route, subroute) → chain; FAQ topics other than Payments go to Orders
+CHAINS = {
+    ("faq", "payments"): PAYMENTS_CHAIN,
+    ("faq", "orders"): ORDERS_CHAIN,
+    ("general", None): GENERAL_CHAIN,
+}
 
-    history += [HumanMessage(content=q), AIMessage(content=ans)]
-    state.update({"chat_history": history, "response": ans})
-    return state
 
+def select_chain(state: Dict):
+    """Pick the prompt chain for the UI‑supplied route/subroute metadata."""
+    route = (state.get("route") or "").lower()
+    if route != "faq":
+        return CHAINS[("general", None)]
+    sub = (state.get("subroute") or "").lower()
+    return CHAINS[("faq", "payments" if sub == "payments" else "orders")]
 
-def general_query_node(state: Dict) -> Dict:
-    """Handle any other general customer‑support query."""
-    q = state["user_input"]
-    history: List[BaseMessage] = state.get("chat_history", [])
-    sys_prompt = (
-        "You are a helpful, empathetic e‑commerce customer‑support assistant. "
-        "Answer the user's question in a clear, friendly manner."
-    )
-    messages = [HumanMessage(content=f"{sys_prompt}\n\nQ: {q}")]
-    ans = llm.invoke(messages).content
 
-    history += [HumanMessage(content=q), AIMessage(content=ans)]
-    state.update({"chat_history": history, "response": ans})
-    return state
+def answer_node(state: Dict) -> Dict:
+    """Handle FAQ (Payments / Orders) and general customer‑support questions."""
+    return _answer(state, select_chain(state))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Graph construction helper
@@ -84,38 +116,16 @@ def general_query_node(state: Dict) -> Dict:
 def build_chatbot_graph():
     sg = StateGraph(dict)  # our state type is just a vanilla dict
 
-    # Identity router node – does nothing but let us attach conditional edges
+    # Identity router node – the answer node picks its prompt from the route metadata
     def identity(state: Dict) -> Dict:
         return state
 
     sg.add_node("router", identity)
-    sg.add_node("FAQ_PAYMENTS", faq_payments_node)
-    sg.add_node("FAQ_ORDERS", faq_orders_node)
-    sg.add_node("GENERAL", general_query_node)
-
-    # ‑‑ Edge selection logic (LangChain routing inside LangGraph) ‑‑
-    def route_selector(state: Dict) -> str:
-        """Decide which node to send control to next, based on UI‑supplied metadata."""
-        route = (state.get("route") or "").lower()
-        sub = (state.get("subroute") or "").lower()
-        if route == "faq":
-            return "FAQ_PAYMENTS" if sub == "payments" else "FAQ_ORDERS"
-        return "GENERAL"
-
-    sg.add_conditional_edges(
-        "router",
-        route_selector,
-        {
-            "FAQ_PAYMENTS": "FAQ_PAYMENTS",
-            "FAQ_ORDERS": "FAQ_ORDERS",
-            "GENERAL": "GENERAL",
-        },
-    )
+    sg.add_node("ANSWER", answer_node)
 
-    # All leaf nodes end the graph
-    sg.add_edge("FAQ_PAYMENTS", END)
-    sg.add_edge("FAQ_ORDERS", END)
-    sg.add_edge("GENERAL", END)
+    # router → answer → END, no conditional dispatch needed
+    sg.add_edge("router", "ANSWER")
+    sg.add_edge("ANSWER", END)
 
     sg.set_entry_point("router")
     return sg.compile()
@@ -128,7 +138,7 @@ def run_chatbot(
     user_input: str,
     route: str,
     subroute: Optional[str] = None,
-    chat_history: Optional[List[BaseMessage]] = None,
+    chat_history: Optional[List[ChatMessage]] = None,
 ):
     """Helper invoked by the UI. Returns (response, updated_history)."""
     chat_history = chat_history or []
@@ -138,11 +148,46 @@ def run_chatbot(
             "route": route,
             "subroute": subroute,
             "chat_history": chat_history,
-        }
+        },
+        config=RUN_CONFIG,
     )
     return result_state["response"], result_state["chat_history"]
 
 
+def stream_chatbot(
+    user_input: str,
+    route: str,
+    subroute: Optional[str],
+    chat_history: List[ChatMessage],
+) -> Iterator[str]:
+    """Streaming variant for `st.write_stream`: yields the answer token by token.
+
+    chat_history is updated in place once the graph finishes."""
+    final_state: Dict = {}
+    streamed = False
+    for mode, payload in _graph.stream(
+        {
+            "user_input": user_input,
+            "route": route,
+            "subroute": subroute,
+            "chat_history": chat_history,
+        },
+        config=RUN_CONFIG,
+        stream_mode=["messages", "values"],
+    ):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "ANSWER" and chunk.content:
+                streamed = True
+                yield chunk.content
+        else:
+            final_state = payload
+
+    if not streamed:  # model did not stream, send the whole answer
+        yield final_state.get("response", "")
+    chat_history[:] = final_state.get("chat_history", chat_history)
+
+
 # =============================
 # File: app.py   (Streamlit UI)
 # =============================
@@ -154,8 +199,9 @@ Run with:
 """
 
 import streamlit as st
-from langchain_core.messages import HumanMessage, AIMessage
-from chatbot_graph import run_chatbot  # local import
+from chatbot_graph import stream_chatbot  # local import
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
 
 st.set_page_config(page_title="E‑Commerce Chatbot", page_icon="🛒", layout="centered")
 
@@ -181,41 +227,45 @@ with st.sidebar:
 # Session‑state for chat history
 # ──────────────────────────────────────────────────────────────────────────────
 if "history" not in st.session_state:
-    st.session_state.history: List[BaseMessage] = []
-
-# ──────────────────────────────────────────────────────────────────────────────
-# Chat input & handling
-# ──────────────────────────────────────────────────────────────────────────────
-user_msg = st.chat_input("Ask me anything…")
-
-if user_msg:
-    # Echo user message
-    st.chat_message("user").markdown(user_msg)
-
-    # Call back‑end
-    reply, updated_hist = run_chatbot(
-        user_input=user_msg,
-        route=query_type,
-        subroute=subroute,
-        chat_history=st.session_state.history,
-    )
-
-    st.session_state.history = updated_hist
-
-    st.chat_message("assistant").markdown(reply)
+    st.session_state.history: List[ChatMessage] = []
 
 # ──────────────────────────────────────────────────────────────────────────────
-# Optional expandable chat log
+# Chat input & handling (a fragment: sending a message reruns only this part)
 # ──────────────────────────────────────────────────────────────────────────────
-with st.expander("Conversation log"):
-    for msg in st.session_state.history:
-        role = "User" if isinstance(msg, HumanMessage) else "Assistant"
-        st.markdown(f"**{role}:** {msg.content}")
+@st.fragment
+def chat_panel(query_type: str, subroute: Optional[str]):
+    user_msg = st.chat_input("Ask me anything…")
+
+    if user_msg:
+        # Echo user message
+        st.chat_message("user").markdown(user_msg)
+
+        # Call back‑end, rendering the reply as it is generated (updates the history)
+        with st.chat_message("assistant"):
+            st.write_stream(
+                stream_chatbot(
+                    user_input=user_msg,
+                    route=query_type,
+                    subroute=subroute,
+                    chat_history=st.session_state.history,
+                )
+            )
+
+    # ──────────────────────────────────────────────────────────────────────────
+    # Optional expandable chat log
+    # ──────────────────────────────────────────────────────────────────────────
+    with st.expander("Conversation log"):
+        for msg in st.session_state.history:
+            st.markdown(f"**{ROLE_LABELS[msg['role']]}:** {msg['content']}")
+
+
+chat_panel(query_type, subroute)
 
 # =============================
 # File: requirements.txt (optional helper)
 # =============================
 # langgraph>=0.0.40
 # langchain-openai>=0.1.0
-# streamlit>=1.33
+# httpx[http2]  # pooled HTTP/2 connections for the OpenAI client
+# streamlit>=1.37  # st.fragment
 # python-dotenv  # if you prefer .env files for API keys
@@ -1,8 +1,12 @@
 import streamlit as st
-from typing import Dict, Any, List
-from dataclasses import dataclass
+from typing import Dict, Any, Deque
+from dataclasses import dataclass, field
+from types import MappingProxyType
 from enum import Enum
+from collections import Counter, deque
+from flashtext import KeywordProcessor
 import json
+import re
 import time
 
 # Define the state and node types
@@ -14,105 +18,128 @@ class NodeType(Enum):
     ORDERS = "orders"
     FAQ_ROUTER = "faq_router"
 
+# Messages kept per session; older ones drop off the front
+MAX_MESSAGES = 200
+
+def message_column() -> Deque[str]:
+    return deque(maxlen=MAX_MESSAGES)
+
 @dataclass
 class ChatState:
-    messages: List[Dict[str, str]]
-    current_node: NodeType
-    context: Dict[str, Any]
-    user_input: str
-    response: str
+    # Message history as parallel columns: message i is (roles[i], contents[i], nodes[i])
+    roles: Deque[str] = field(default_factory=message_column)
+    contents: Deque[str] = field(default_factory=message_column)
+    nodes: Deque[str] = field(default_factory=message_column)
+    current_node: NodeType = NodeType.ROUTER
+    context: Dict[str, Any] = field(default_factory=dict)
+    user_input: str = ""
+    response: str = ""
+
+# Sample data for different nodes (read-only, shared by every session)
+FAQ_GENERAL_DATA = MappingProxyType({
+    "what are your hours": "We are open 24/7 for online support. Our phone support is available Monday-Friday 9AM-6PM EST.",
+    "how to contact support": "You can reach us via email at support@company.com, phone at 1-800-SUPPORT, or through this chat.",
+    "where are you located": "Our headquarters is in New York, but we serve customers worldwide.",
+    "what services do you offer": "We offer e-commerce solutions, customer support, payment processing, and order management."
+})
+
+FAQ_SPECIFIC_DATA = MappingProxyType({
+    "how to return an item": "To return an item, go to 'My Orders', select the item, and click 'Return'. You have 30 days from purchase.",
+    "shipping policy": "We offer free shipping on orders over $50. Standard shipping takes 3-5 business days.",
+    "warranty information": "All products come with a 1-year manufacturer warranty. Extended warranties are available for purchase.",
+    "product specifications": "Product specifications vary by item. Check the product page for detailed technical specifications."
+})
+
+PAYMENT_DATA = MappingProxyType({
+    "payment methods": "We accept all major credit cards, PayPal, Apple Pay, and Google Pay.",
+    "payment failed": "If your payment failed, please check your card details and try again. Contact your bank if issues persist.",
+    "refund process": "Refunds are processed within 5-7 business days to your original payment method.",
+    "payment security": "We use SSL encryption and PCI compliance to ensure your payment information is secure."
+})
+
+ORDERS_DATA = MappingProxyType({
+    "track order": "To track your order, go to 'My Orders' and click on the tracking number, or use our order tracking page.",
+    "cancel order": "Orders can be cancelled within 1 hour of placement. After that, you'll need to return the item.",
+    "order status": "You can check your order status in 'My Orders' section of your account.",
+    "delivery time": "Standard delivery is 3-5 business days. Express delivery is 1-2 business days."
+})
+
+# Intent keywords, one precompiled alternation per category (substring matches,
+# like the `keyword in text` checks they replace); run on the lowercased input
+PAYMENT_RE = re.compile(r"payment|pay|card|billing|charge|refund|money")
+ORDER_RE = re.compile(r"order|track|delivery|shipping|cancel|status")
+FAQ_SPECIFIC_RE = re.compile(r"return|warranty|shipping|specifications|technical")
+
+def build_keyword_index(data_dict: Dict[str, str]):
+    """FlashText processor over the words of every key, plus word -> keys containing it"""
+    keyword_processor = KeywordProcessor(case_sensitive=False)
+    keys_by_word = {}
+    for key in data_dict:
+        for keyword in key.split():
+            keyword_processor.add_keyword(keyword)
+            keys_by_word.setdefault(keyword, []).append(key)
+    return keyword_processor, keys_by_word
+
+# data_key -> (data dict, keyword index), built once at import
+DATA = MappingProxyType({
+    data_key: (data_dict, build_keyword_index(data_dict))
+    for data_key, data_dict in (
+        ("faq_general", FAQ_GENERAL_DATA),
+        ("faq_specific", FAQ_SPECIFIC_DATA),
+        ("payment", PAYMENT_DATA),
+        ("orders", ORDERS_DATA),
+    )
+})
+
+# Answers depend only on (data_key, normalized question), so repeats skip the match
+# Not wrapped in st.cache_data: hashing and copying the cached result costs
+# several times the ~10µs a FlashText scan takes
+def _match(data_key: str, user_input_norm: str) -> str:
+    """Find the best matching response from the data dictionary"""
+    data_dict, (keyword_processor, keys_by_word) = DATA[data_key]
+    
+    # One scan of the input finds every key word it contains; a key scores
+    # one point per word found
+    scores = Counter()
+    for keyword in set(keyword_processor.extract_keywords(user_input_norm)):
+        scores.update(keys_by_word[keyword])
+    
+    # Highest score wins, the earlier key on ties
+    best_key = max(data_dict, key=scores.__getitem__, default=None)
+    if best_key is None or not scores[best_key]:
+        return "I'm sorry, I don't have specific information about that. Could you please rephrase your question?"
+    return data_dict[best_key]
 
 class LangGraphChatbot:
-    def __init__(self):
-        self.state = ChatState(
-            messages=[],
-            current_node=NodeType.ROUTER,
-            context={},
-            user_input="",
-            response=""
-        )
-        
-        # Sample data for different nodes
-        self.faq_general_data = {
-            "what are your hours": "We are open 24/7 for online support. Our phone support is available Monday-Friday 9AM-6PM EST.",
-            "how to contact support": "You can reach us via email at support@company.com, phone at 1-800-SUPPORT, or through this chat.",
-            "where are you located": "Our headquarters is in New York, but we serve customers worldwide.",
-            "what services do you offer": "We offer e-commerce solutions, customer support, payment processing, and order management."
-        }
-        
-        self.faq_specific_data = {
-            "how to return an item": "To return an item, go to 'My Orders', select the item, and click 'Return'. You have 30 days from purchase.",
-            "shipping policy": "We offer free shipping on orders over $50. Standard shipping takes 3-5 business days.",
-            "warranty information": "All products come with a 1-year manufacturer warranty. Extended warranties are available for purchase.",
-            "product specifications": "Product specifications vary by item. Check the product page for detailed technical specifications."
-        }
-        
-        self.payment_data = {
-            "payment methods": "We accept all major credit cards, PayPal, Apple Pay, and Google Pay.",
-            "payment failed": "If your payment failed, please check your card details and try again. Contact your bank if issues persist.",
-            "refund process": "Refunds are processed within 5-7 business days to your original payment method.",
-            "payment security": "We use SSL encryption and PCI compliance to ensure your payment information is secure."
-        }
-        
-        self.orders_data = {
-            "track order": "To track your order, go to 'My Orders' and click on the tracking number, or use our order tracking page.",
-            "cancel order": "Orders can be cancelled within 1 hour of placement. After that, you'll need to return the item.",
-            "order status": "You can check your order status in 'My Orders' section of your account.",
-            "delivery time": "Standard delivery is 3-5 business days. Express delivery is 1-2 business days."
-        }
+    """Stateless graph logic; the per-session ChatState is passed in"""
 
-    def classify_intent(self, user_input: str) -> NodeType:
+    def classify_intent(self, user_input_lower: str) -> NodeType:
         """Classify user intent to route to appropriate node"""
-        user_input_lower = user_input.lower()
-        
-        # FAQ keywords
-        faq_keywords = ["help", "question", "how", "what", "when", "where", "why", "faq"]
-        # Payment keywords
-        payment_keywords = ["payment", "pay", "card", "billing", "charge", "refund", "money"]
-        # Order keywords
-        order_keywords = ["order", "track", "delivery", "shipping", "cancel", "status"]
-        
-        if any(keyword in user_input_lower for keyword in payment_keywords):
+        # Payment keywords win over order keywords; everything else, FAQ
+        # keywords included, goes to the FAQ router
+        if PAYMENT_RE.search(user_input_lower):
             return NodeType.PAYMENT
-        elif any(keyword in user_input_lower for keyword in order_keywords):
+        elif ORDER_RE.search(user_input_lower):
             return NodeType.ORDERS
-        elif any(keyword in user_input_lower for keyword in faq_keywords):
-            return NodeType.FAQ_ROUTER
         else:
             return NodeType.FAQ_ROUTER  # Default to FAQ for general queries
 
-    def classify_faq_type(self, user_input: str) -> NodeType:
+    def classify_faq_type(self, user_input_lower: str) -> NodeType:
         """Classify FAQ into general or specific"""
-        user_input_lower = user_input.lower()
-        
-        # Specific FAQ keywords
-        specific_keywords = ["return", "warranty", "shipping", "specifications", "technical"]
-        
-        if any(keyword in user_input_lower for keyword in specific_keywords):
+        if FAQ_SPECIFIC_RE.search(user_input_lower):
             return NodeType.FAQ_SPECIFIC
         else:
             return NodeType.FAQ_GENERAL
 
-    def find_best_match(self, user_input: str, data_dict: Dict[str, str]) -> str:
-        """Find the best matching response from the data dictionary"""
-        user_input_lower = user_input.lower()
-        best_match = None
-        highest_score = 0
-        
-        for key, value in data_dict.items():
-            # Simple keyword matching
-            keywords = key.split()
-            score = sum(1 for keyword in keywords if keyword in user_input_lower)
-            
-            if score > highest_score:
-                highest_score = score
-                best_match = value
-        
-        return best_match if best_match else "I'm sorry, I don't have specific information about that. Could you please rephrase your question?"
+    def find_best_match(self, user_input_lower: str, data_key: str) -> str:
+        """Best matching response from the data dictionary stored under data_key"""
+        return _match(data_key, user_input_lower.strip())
 
     def router_node(self, state: ChatState) -> ChatState:
         """Main router node that directs to appropriate specialized nodes"""
-        intent = self.classify_intent(state.user_input)
+        # Lowercased once per turn, shared by every classifier and matcher below
+        state.context["input_lower"] = state.user_input.lower()
+        intent = self.classify_intent(state.context["input_lower"])
         state.current_node = intent
         
         if intent == NodeType.FAQ_ROUTER:
@@ -126,7 +153,7 @@ class LangGraphChatbot:
 
     def faq_router_node(self, state: ChatState) -> ChatState:
         """FAQ router that determines general vs specific FAQ"""
-        faq_type = self.classify_faq_type(state.user_input)
+        faq_type = self.classify_faq_type(state.context["input_lower"])
         state.current_node = faq_type
         
         if faq_type == NodeType.FAQ_GENERAL:
@@ -136,48 +163,89 @@ class LangGraphChatbot:
 
     def faq_general_node(self, state: ChatState) -> ChatState:
         """Handle general FAQ questions"""
-        response = self.find_best_match(state.user_input, self.faq_general_data)
+        response = self.find_best_match(state.context["input_lower"], "faq_general")
         state.response = f"📋 **General FAQ**: {response}"
         return state
 
     def faq_specific_node(self, state: ChatState) -> ChatState:
         """Handle specific FAQ questions"""
-        response = self.find_best_match(state.user_input, self.faq_specific_data)
+        response = self.find_best_match(state.context["input_lower"], "faq_specific")
         state.response = f"🔍 **Specific FAQ**: {response}"
         return state
 
     def payment_node(self, state: ChatState) -> ChatState:
         """Handle payment-related queries"""
-        response = self.find_best_match(state.user_input, self.payment_data)
+        response = self.find_best_match(state.context["input_lower"], "payment")
         state.response = f"💳 **Payment Support**: {response}"
         return state
 
     def orders_node(self, state: ChatState) -> ChatState:
         """Handle order-related queries"""
-        response = self.find_best_match(state.user_input, self.orders_data)
+        response = self.find_best_match(state.context["input_lower"], "orders")
         state.response = f"📦 **Order Support**: {response}"
         return state
 
-    def process_message(self, user_input: str) -> str:
+    def process_message(self, state: ChatState, user_input: str) -> str:
         """Process user message through the graph"""
-        self.state.user_input = user_input
+        state.user_input = user_input
         
         # Start with router node
-        self.state = self.router_node(self.state)
+        state = self.router_node(state)
         
         # Add to message history
-        self.state.messages.append({
-            "role": "user",
-            "content": user_input,
-            "node": self.state.current_node.value
-        })
-        self.state.messages.append({
-            "role": "assistant",
-            "content": self.state.response,
-            "node": self.state.current_node.value
-        })
+        node = state.current_node.value
+        state.roles += ("user", "assistant")
+        state.contents += (user_input, state.response)
+        state.nodes += (node, node)
+        
+        # Node usage for the side panel, kept up to date instead of recounted per render
+        state.context.setdefault("node_counts", Counter())[node] += 1
+        
+        return state.response
+
+def stream_words(text: str):
+    """Yield text word by word so `st.write_stream` can render it progressively"""
+    for word in text.split(" "):
+        yield word + " "
+
+# One chatbot shared by every session and rerun
+@st.cache_resource(show_spinner=False)
+def get_chatbot() -> LangGraphChatbot:
+    return LangGraphChatbot()
+
+@st.fragment
+def chat_panel(chatbot: LangGraphChatbot):
+    """Chat history and input; a new message reruns only this panel"""
+    st.header("💬 Chat Interface")
+    
+    # Display chat history
+    chat_container = st.container()
+    with chat_container:
+        chat_state = st.session_state.chat_state
+        for role, content, node in zip(chat_state.roles, chat_state.contents, chat_state.nodes):
+            if role == "user":
+                st.chat_message("user").write(content)
+            else:
+                with st.chat_message("assistant"):
+                    st.write(content)
+                    st.caption(f"Handled by: {node}")
+    
+    # User input
+    user_input = st.chat_input("Type your message here...")
+    
+    if user_input:
+        # Display user message immediately
+        st.chat_message("user").write(user_input)
+        
+        # Process message through LangGraph
+        with st.spinner("Processing..."):
+            response = chatbot.process_message(st.session_state.chat_state, user_input)
         
-        return self.state.response
+        # Display assistant response; it stays on screen as the latest turn, so
+        # no rerun is needed (the sidebar and node stats refresh on the next full run)
+        with st.chat_message("assistant"):
+            st.write_stream(stream_words(response))
+            st.caption(f"Handled by: {st.session_state.chat_state.current_node.value}")
 
 def main():
     st.set_page_config(
@@ -189,9 +257,10 @@ def main():
     st.title("🤖 Multi-Agent LangGraph Chatbot")
     st.markdown("---")
     
-    # Initialize chatbot
-    if 'chatbot' not in st.session_state:
-        st.session_state.chatbot = LangGraphChatbot()
+    # Shared chatbot, per-session conversation state
+    chatbot = get_chatbot()
+    if 'chat_state' not in st.session_state:
+        st.session_state.chat_state = ChatState()
     
     # Sidebar with information
     with st.sidebar:
@@ -207,63 +276,29 @@ def main():
         """)
         
         st.header("📊 Current Session")
-        total_messages = len(st.session_state.chatbot.state.messages)
+        total_messages = len(st.session_state.chat_state.roles)
         st.metric("Total Messages", total_messages)
         
         if st.button("🗑️ Clear Chat History"):
-            st.session_state.chatbot = LangGraphChatbot()
+            st.session_state.chat_state = ChatState()
             st.rerun()
     
     # Main chat interface
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.header("💬 Chat Interface")
-        
-        # Display chat history
-        chat_container = st.container()
-        with chat_container:
-            for i, message in enumerate(st.session_state.chatbot.state.messages):
-                if message["role"] == "user":
-                    st.chat_message("user").write(message["content"])
-                else:
-                    with st.chat_message("assistant"):
-                        st.write(message["content"])
-                        st.caption(f"Handled by: {message['node']}")
-        
-        # User input
-        user_input = st.chat_input("Type your message here...")
-        
-        if user_input:
-            # Display user message immediately
-            st.chat_message("user").write(user_input)
-            
-            # Process message through LangGraph
-            with st.spinner("Processing..."):
-                response = st.session_state.chatbot.process_message(user_input)
-            
-            # Display assistant response
-            with st.chat_message("assistant"):
-                st.write(response)
-                st.caption(f"Handled by: {st.session_state.chatbot.state.current_node.value}")
-            
-            st.rerun()
+        chat_panel(chatbot)
     
     with col2:
         st.header("🔍 Node Activity")
         
         # Show current node
-        if st.session_state.chatbot.state.current_node:
-            st.info(f"**Current Node**: {st.session_state.chatbot.state.current_node.value}")
+        if st.session_state.chat_state.current_node:
+            st.info(f"**Current Node**: {st.session_state.chat_state.current_node.value}")
         
         # Show node statistics
-        if st.session_state.chatbot.state.messages:
-            node_counts = {}
-            for msg in st.session_state.chatbot.state.messages:
-                if msg["role"] == "assistant":
-                    node = msg["node"]
-                    node_counts[node] = node_counts.get(node, 0) + 1
-            
+        node_counts = st.session_state.chat_state.context.get("node_counts")
+        if node_counts:
             st.subheader("Node Usage")
             for node, count in node_counts.items():
                 st.metric(node.replace("_", " ").title(), count)
@@ -282,7 +317,7 @@ def main():
         for query in sample_queries:
             if st.button(query, key=f"sample_{query}"):
                 # Simulate user input
-                response = st.session_state.chatbot.process_message(query)
+                response = chatbot.process_message(st.session_state.chat_state, query)
                 st.rerun()
 
 if __name__ == "__main__":
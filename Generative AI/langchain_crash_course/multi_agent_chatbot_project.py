@@ -3,49 +3,95 @@
 # Description: LangGraph backend with multi‑agent routing (FAQ → general/specific, Search)
 # ===============================
 from __future__ import annotations
+import asyncio
 import os
 import re
-from typing import Dict, Any
+import threading
+from typing import TYPE_CHECKING, Dict, Any, AsyncIterator, Awaitable, Iterator
 
-import pandas as pd
-import wikipedia
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.agents import Tool, initialize_agent
-from langgraph.graph import Graph
+import streamlit as st
+from rapidfuzz import fuzz, process, utils
+
+# pandas, wikipedia, langchain and langgraph are imported where they are first
+# needed, so the UI starts before they load
+if TYPE_CHECKING:
+    from langchain.chat_models import ChatOpenAI
+    from langgraph.graph import Graph
+
+# Router keywords, compiled once at import; matched against the lowercased input
+FAQ_SPECIFIC_RE = re.compile(r"(order|payment|price|refund|shipping)")
+SEARCH_RE = re.compile(r"^search|wiki|web")
 
 # ---------- Tools ---------- #
 
 class CSVFAQTool:
-    """Simple lookup tool that returns an exact‑match answer from a CSV file.
+    """Simple lookup tool that returns an exact‑match answer from a CSV file,
+    falling back to the closest fuzzy match.
 
     The CSV is expected to have two columns: `question` and `answer`."""
 
     def __init__(self, csv_path: str):
         if not os.path.isfile(csv_path):
             raise FileNotFoundError(f"CSV FAQ file not found: {csv_path}")
-        self.df = pd.read_csv(csv_path)
-        # Normalize for quick lookup
-        self.df["question_norm"] = self.df["question"].str.lower().str.strip()
+        import pandas as pd
+
+        df = pd.read_csv(csv_path)
+        # Normalized question -> answer in one pass over the raw columns (blank
+        # questions skipped), first row wins on duplicates
+        self.lookup: Dict[str, str] = {}
+        for question, answer in zip(df["question"].to_numpy(), df["answer"].to_numpy()):
+            if isinstance(question, str):
+                self.lookup.setdefault(question.strip().casefold(), answer)
+        self._keys = list(self.lookup)  # fuzzy candidates
 
     def __call__(self, question: str) -> str | None:
-        match = self.df[self.df["question_norm"] == question.lower().strip()]
-        if not match.empty:
-            return match.iloc[0]["answer"]
+        q_norm = question.strip().casefold()
+        answer = self.lookup.get(q_norm)
+        if answer is not None:
+            return answer
+        # Near miss (typos, punctuation): closest question scoring >= 90 on the whole
+        # string. WRatio would accept a short query that merely shares a phrase with
+        # a long question ("order pizza" -> the cancel-order answer).
+        match = process.extractOne(q_norm, self._keys, scorer=fuzz.token_sort_ratio,
+                                   processor=utils.default_process, score_cutoff=90)
+        if match:
+            return self.lookup[match[0]]
         return None
 
 
+# One lookup table per CSV, shared by every session
+@st.cache_resource(show_spinner=False)
+def get_csv_tool(csv_path: str) -> CSVFAQTool:
+    return CSVFAQTool(csv_path)
+
+
+# Cached for a day per normalized query; only successful lookups are stored
+# because failures raise
+@st.cache_data(ttl=86400, max_entries=2048, show_spinner=False)
+def _wiki_summary(query_norm: str, sentences: int) -> str:
+    import wikipedia
+
+    page_title = wikipedia.search(query_norm)[0]
+    return wikipedia.summary(page_title, sentences=sentences)
+
+
 def wiki_search(query: str, sentences: int = 2) -> str:
-    """Return a short summary from Wikipedia (best effort)."""
+    """Return a short summary from Wikipedia (best effort, cached per normalized query)."""
     try:
-        page_title = wikipedia.search(query)[0]
-        summary = wikipedia.summary(page_title, sentences=sentences)
-        return summary
+        return _wiki_summary(query.strip().lower(), sentences)
     except Exception:
         return "Wikipedia did not return results."
 
 # ---------- Agent / Node definitions ---------- #
 
+# One client (and HTTP connection pool) per model setting, reusable across graphs
+@st.cache_resource(show_spinner=False)
+def get_llm(model: str, temperature: float) -> ChatOpenAI:
+    from langchain.chat_models import ChatOpenAI
+
+    return ChatOpenAI(model=model, temperature=temperature)
+
+
 def build_graph(csv_path: str) -> Graph:
     """Construct and return the LangGraph with three inner nodes and a hierarchical router.
 
@@ -57,11 +103,14 @@ def build_graph(csv_path: str) -> Graph:
       • search            – web/wiki + LLM answer
     """
 
+    from langchain.prompts import PromptTemplate
+    from langgraph.graph import Graph
+
     # --- Shared resources --- #
-    llm_det = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)  # deterministic for lookup
-    llm_creative = ChatOpenAI(model="gpt-4o", temperature=0.7)
+    llm_det = get_llm("gpt-4o-mini", 0.1)  # deterministic for lookup
+    llm_creative = get_llm("gpt-4o", 0.7)
 
-    csv_tool = CSVFAQTool(csv_path)
+    csv_tool = get_csv_tool(csv_path)
 
     # Prompt templates
     general_prompt = PromptTemplate.from_template(
@@ -72,48 +121,47 @@ def build_graph(csv_path: str) -> Graph:
         """You are an expert research assistant. Based on the context below, craft a helpful answer.\n\nContext:\n{context}\n\nUser question: {question}\nHelpful answer:"""
     )
 
-    # --- Node functions --- #
-    def general_faq_node(state: Dict[str, Any]):
+    # --- Node functions (async, so LLM and Wikipedia calls don't block the runner) --- #
+    async def general_faq_node(state: Dict[str, Any]):
         q = state["input"]
-        response = llm_det(general_prompt.format_prompt(question=q).to_messages()).content
+        response = (await llm_det.ainvoke(general_prompt.format_prompt(question=q).to_messages())).content
         state["response"] = response
         return state
 
-    def specific_faq_node(state: Dict[str, Any]):
+    async def specific_faq_node(state: Dict[str, Any]):
         q = state["input"]
         answer = csv_tool(q)
         if answer:
             state["response"] = answer
         else:
             # Fallback to LLM with explicit notice
-            reply = llm_creative(
+            reply = (await llm_creative.ainvoke(
                 general_prompt.format_prompt(question=q + " (Answer based on best available knowledge)").to_messages()
-            ).content
+            )).content
             state["response"] = reply
         return state
 
-    def search_node(state: Dict[str, Any]):
+    async def search_node(state: Dict[str, Any]):
         q = state["input"]
-        wiki_ctx = wiki_search(q)
+        wiki_ctx = await asyncio.to_thread(wiki_search, q)  # blocking HTTP client
         # Could extend with real web search (SerpAPI / DuckDuckGo, etc.)
         combined_ctx = wiki_ctx
-        answer = llm_creative(
+        answer = (await llm_creative.ainvoke(
             search_synthesis_prompt.format_prompt(context=combined_ctx, question=q).to_messages()
-        ).content
+        )).content
         state["response"] = answer
         return state
 
     # --- Routers --- #
     def faq_router(state: Dict[str, Any]):
-        q = state["input"].lower()
         # Very naive classifier – improve with few‑shot LLM classification
-        if re.search(r"(order|payment|price|refund|shipping)", q):
+        if FAQ_SPECIFIC_RE.search(state["input_lower"]):
             return "specific_faq"
         return "general_faq"
 
     def top_router(state: Dict[str, Any]):
-        q = state["input"].lower()
-        if q.startswith("search") or "wiki" in q or "web" in q:
+        # Starts with "search", or mentions wiki/web anywhere
+        if SEARCH_RE.search(state["input_lower"]):
             return "search"
         return "faq_router"
 
@@ -139,20 +187,78 @@ def build_graph(csv_path: str) -> Graph:
     graph.set_entry_point("router")
     return graph
 
-# Convenience wrapper for Streamlit UI
-_graph_cache: Graph | None = None
+# Convenience wrapper for Streamlit UI: one graph per CSV, shared by every session
+@st.cache_resource(show_spinner=False)
 def get_graph(csv_path: str = "faq_data.csv") -> Graph:
-    global _graph_cache
-    if _graph_cache is None:
-        _graph_cache = build_graph(csv_path)
-    return _graph_cache
+    return build_graph(csv_path)
+
+
+def initial_state(question: str) -> Dict[str, Any]:
+    """Graph input; the lowercased question is computed once for both routers."""
+    return {"input": question, "input_lower": question.lower()}
+
+
+# One long-lived event loop for every graph call. The cached LLM clients keep
+# async keep-alive connections bound to the loop they first ran on, so a fresh
+# loop per turn (asyncio.run) would leave them on a closed loop.
+@st.cache_resource(show_spinner=False)
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="graph-event-loop", daemon=True).start()
+    return loop
+
+
+def _run(coro: Awaitable):
+    """Run coro on the shared graph loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
 
 
 def run_chat(question: str, csv_path: str = "faq_data.csv") -> str:
     graph = get_graph(csv_path)
-    result_state = graph.invoke({"input": question})
+    result_state = _run(graph.ainvoke(initial_state(question)))
     return result_state["response"]
 
+
+_EXHAUSTED = object()
+
+async def _anext(agen: AsyncIterator):
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return _EXHAUSTED
+
+
+def _iter_async(agen: AsyncIterator) -> Iterator:
+    """Drive an async iterator on the shared graph loop from sync code (e.g. `st.write_stream`), one item at a time."""
+    try:
+        while True:
+            item = _run(_anext(agen))
+            if item is _EXHAUSTED:
+                break
+            yield item
+    finally:
+        _run(agen.aclose())
+
+
+def stream_chat(question: str, csv_path: str = "faq_data.csv") -> Iterator[str]:
+    """Like `run_chat`, but yields LLM tokens as they arrive (for `st.write_stream`).
+
+    Answers that do not come from a streaming LLM call, e.g. CSV hits, are
+    yielded whole once the graph finishes."""
+    graph = get_graph(csv_path)
+    final_state: Dict[str, Any] = {}
+    streamed = False
+    for mode, payload in _iter_async(graph.astream(initial_state(question), stream_mode=["messages", "values"])):
+        if mode == "messages":
+            chunk, _metadata = payload
+            if chunk.content:
+                streamed = True
+                yield chunk.content
+        else:
+            final_state = payload
+    if not streamed:
+        yield final_state.get("response", "")
+
 # ===============================
 # File: streamlit_ui.py
 # Description: Minimal Streamlit front‑end.
@@ -164,7 +270,7 @@ Save as `streamlit_ui.py` and run with:
 """
 
 import streamlit as st
-from agents import run_chat
+from agents import stream_chat
 
 st.set_page_config(page_title="Multi‑Agent Chatbot", page_icon="🤖")
 
@@ -173,18 +279,22 @@ if "history" not in st.session_state:
 
 st.title("🤖 Multi‑Agent LangGraph Chatbot")
 
-user_input = st.chat_input("Ask me anything…")
-if user_input:
-    # Get response from backend
-    answer = run_chat(user_input)
-    st.session_state.history.append(("user", user_input))
-    st.session_state.history.append(("bot", answer))
-
 # Display conversation
 for role, text in st.session_state.history:
     with st.chat_message("assistant" if role == "bot" else "user"):
         st.markdown(text)
 
+user_input = st.chat_input("Ask me anything…")
+if user_input:
+    with st.chat_message("user"):
+        st.markdown(user_input)
+
+    # Stream the response from the backend as it is generated
+    with st.chat_message("assistant"):
+        answer = st.write_stream(stream_chat(user_input))
+    st.session_state.history.append(("user", user_input))
+    st.session_state.history.append(("bot", answer))
+
 st.sidebar.header("About")
 st.sidebar.write(
     "This demo routes messages between FAQ (general/specific) and Search nodes using LangGraph.\n"
@@ -197,6 +307,6 @@ st.sidebar.write(
 # 1. Create `faq_data.csv` with two columns: `question,answer`.
 # 2. Set the environment variable OPENAI_API_KEY (and optionally SERPAPI_KEY).
 # 3. Install dependencies:
-#       pip install langchain langgraph streamlit openai pandas wikipedia duckduckgo-search
+#       pip install langchain langgraph streamlit openai pandas wikipedia rapidfuzz duckduckgo-search
 # 4. Run: streamlit run streamlit_ui.py
 # ===============================
@@ -0,0 +1,48 @@
+import types
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("pandas")
+pytest.importorskip("rapidfuzz")
+
+HERE = Path(__file__).parent
+FAQ_CSV = HERE.parent / "Route Demo" / "GenAI_Exercise6" / "Exercise_Solution" / "App" / "Resources" / "faq_data.csv"
+
+
+def load_agents():
+    """The backend half of multi_agent_chatbot_project.py (the `agents.py` part, without the UI)."""
+    source = (HERE / "multi_agent_chatbot_project.py").read_text(encoding="utf-8")
+    backend = source.split("# File: streamlit_ui.py")[0]
+    module = types.ModuleType("agents")
+    exec(compile(backend, "agents.py", "exec"), module.__dict__)
+    return module
+
+
+@pytest.fixture(scope="module")
+def csv_tool():
+    return load_agents().CSVFAQTool(str(FAQ_CSV))
+
+
+def test_exact_match(csv_tool):
+    assert csv_tool("  How can I track my order?  ") == \
+        "You can track your order using the tracking link sent to your email."
+
+
+@pytest.mark.parametrize("question, answer_start", [
+    ("how can i trak my order", "You can track your order"),
+    ("What payment method are accepted?", "We accept credit/debit cards"),
+    ("how long does it take to proces a refund", "Refunds are processed"),
+])
+def test_near_miss_uses_fuzzy_match(csv_tool, question, answer_start):
+    assert csv_tool(question).startswith(answer_start)
+
+
+@pytest.mark.parametrize("question", [
+    "what is the price of a tesla?",
+    "shipping to mars",
+    "order pizza",
+])
+def test_unrelated_question_falls_back(csv_tool, question):
+    assert csv_tool(question) is None
@@ -1,11 +1,18 @@
 import sqlite3
+import threading
 
-# Connect to SQLite
-conn = sqlite3.connect("chat.db")
-cursor = conn.cursor()
+# Connect to SQLite (one module-level connection; check_same_thread=False lets
+# other threads use it, but they all share its one open transaction)
+conn = sqlite3.connect("chat.db", check_same_thread=False)
+# WAL + NORMAL sync: commits append to the log instead of fsyncing the DB file
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA synchronous=NORMAL")
+
+# Threads must not interleave statements inside one write transaction
+_write_lock = threading.Lock()
 
 # Create table with auto-increment global threadid
-cursor.execute("""
+conn.execute("""
 CREATE TABLE IF NOT EXISTS session_thread (
     sessionid TEXT NOT NULL,
     route TEXT NOT NULL,
@@ -20,25 +27,26 @@ def insert_session_thread(sessionid: str, route: str) -> int:
     Inserts a new (sessionid, route) with a globally unique auto-incremented threadid.
     If it already exists, returns the existing threadid.
     """
-    # Check if the pair exists
-    cursor.execute("""
+    select_sql = """
         SELECT threadid
         FROM session_thread
         WHERE sessionid = ? AND route = ?
-    """, (sessionid, route))
-    row = cursor.fetchone()
-    
+    """
+    # Existing pair: a plain read, no write transaction. conn.execute gives each
+    # call its own cursor, so concurrent callers don't overwrite each other's rows
+    row = conn.execute(select_sql, (sessionid, route)).fetchone()
     if row:
         return row[0]  # Return existing threadid
 
-    # Insert new row (threadid auto-generated by SQLite)
-    cursor.execute("""
-        INSERT INTO session_thread (sessionid, route)
-        VALUES (?, ?)
-    """, (sessionid, route))
-    conn.commit()
-
-    return cursor.lastrowid  # Return the new threadid
+    # New pair: insert and read the id back in one transaction. INSERT OR IGNORE
+    # turns an insert of a pair another caller just added into a no-op; either
+    # way the SELECT returns the single row UNIQUE(sessionid, route) allows.
+    with _write_lock, conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO session_thread (sessionid, route)
+            VALUES (?, ?)
+        """, (sessionid, route))
+        return conn.execute(select_sql, (sessionid, route)).fetchone()[0]
 
 # Example usage
 print(insert_session_thread("sess1", "payment"))  # → 1
@@ -48,8 +56,7 @@ print(insert_session_thread("sess2", "payment"))  # → 3
 print(insert_session_thread("sess1", "order"))    # → 2 (same as before)
 
 # Check table contents
-cursor.execute("SELECT * FROM session_thread ORDER BY threadid")
-for row in cursor.fetchall():
+for row in conn.execute("SELECT * FROM session_thread ORDER BY threadid"):
     print(row)
 
 conn.close()
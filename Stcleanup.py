@@ -6,26 +6,27 @@ def cleanup():
     st.session_state.clear()
     st.toast("Session cleaned!")
 
-# Attach JS that fires on tab close
+# Attach JS that fires on tab close; the same call reports and clears the flag
+# left by the previous tab, so there is no second round-trip to reset it
 dead_flag = streamlit_js_eval(
     js_expressions="""
     (function() {
+        const flag = localStorage.getItem("st_cleanup") || "0";
+        localStorage.removeItem("st_cleanup");
         window.addEventListener("pagehide", () => {
             localStorage.setItem("st_cleanup", "1");
         }, { once: true });
         window.addEventListener("beforeunload", () => {
             localStorage.setItem("st_cleanup", "1");
         }, { once: true });
-        return localStorage.getItem("st_cleanup") || "0";
+        return flag;
     })();
     """,
     key="tab-close"
 )
 
-# If JS wrote the cleanup flag, call Python cleanup
+# If JS found the cleanup flag, call Python cleanup
 if dead_flag == "1":
     cleanup()
-    # reset the flag so it doesn't run again
-    streamlit_js_eval("localStorage.removeItem('st_cleanup');", key="reset-flag")
 
 st.write("This is a minimal example. Close the tab to trigger cleanup.")